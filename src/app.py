@@ -5,122 +5,234 @@ A super simple FastAPI application that allows students to view and sign up
 for extracurricular activities at Mergington High School.
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.exception_handlers import http_exception_handler
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import RedirectResponse
+from fastapi.responses import RedirectResponse, Response
+import hashlib
+import msgspec
 import os
-from pathlib import Path
+from starlette.exceptions import HTTPException as StarletteHTTPException
+
+# Interactive docs and the OpenAPI schema are not served in production
+_IS_PROD = os.getenv("ENV") == "prod"
 
 app = FastAPI(title="Mergington High School API",
-              description="API for viewing and signing up for extracurricular activities")
+              description="API for viewing and signing up for extracurricular activities",
+              docs_url=None if _IS_PROD else "/docs",
+              redoc_url=None if _IS_PROD else "/redoc",
+              openapi_url=None if _IS_PROD else "/openapi.json")
 
 # Mount the static files directory
-current_dir = Path(__file__).parent
-app.mount("/static", StaticFiles(directory=os.path.join(Path(__file__).parent,
-          "static")), name="static")
+current_dir = os.path.dirname(os.path.realpath(__file__))
+_STATIC_DIR = os.path.join(current_dir, "static")
+app.mount("/static", StaticFiles(directory=_STATIC_DIR), name="static")
+
+
+class Activity(msgspec.Struct):
+    """An extracurricular activity and the students signed up for it"""
+    description: str
+    schedule: str
+    max_participants: int
+    participants: set[str]
+    # Open spots, derived from max_participants and participants in
+    # __post_init__ and then kept in step by signup and unregister. Do not
+    # pass it to the constructor; any value given is overwritten.
+    remaining: int = 0
+
+    def __post_init__(self):
+        self.remaining = self.max_participants - len(self.participants)
+
 
 # In-memory activity database
 activities = {
-    "Chess Club": {
-        "description": "Learn strategies and compete in chess tournaments",
-        "schedule": "Fridays, 3:30 PM - 5:00 PM",
-        "max_participants": 12,
-        "participants": ["michael@mergington.edu", "daniel@mergington.edu"]
-    },
-    "Programming Class": {
-        "description": "Learn programming fundamentals and build software projects",
-        "schedule": "Tuesdays and Thursdays, 3:30 PM - 4:30 PM",
-        "max_participants": 20,
-        "participants": ["emma@mergington.edu", "sophia@mergington.edu"]
-    },
-    "Gym Class": {
-        "description": "Physical education and sports activities",
-        "schedule": "Mondays, Wednesdays, Fridays, 2:00 PM - 3:00 PM",
-        "max_participants": 30,
-        "participants": ["john@mergington.edu", "olivia@mergington.edu"]
-    },
-    "Soccer Team": {
-        "description": "Join the school soccer team for practice and matches",
-        "schedule": "Mondays and Thursdays, 4:00 PM - 6:00 PM",
-        "max_participants": 20,
-        "participants": ["alex@mergington.edu", "lisa@mergington.edu"]
-    },
-    "Basketball Club": {
-        "description": "Pickup games and skill development for basketball players",
-        "schedule": "Tuesdays and Fridays, 4:15 PM - 6:00 PM",
-        "max_participants": 15,
-        "participants": ["matt@mergington.edu", "nina@mergington.edu"]
-    },
-    "Art Club": {
-        "description": "Explore drawing, painting, and mixed media",
-        "schedule": "Wednesdays, 3:30 PM - 5:00 PM",
-        "max_participants": 20,
-        "participants": ["ava@mergington.edu", "lucas@mergington.edu"]
-    },
-    "Drama Club": {
-        "description": "Acting, stagecraft, and school productions",
-        "schedule": "Thursdays, 4:00 PM - 6:00 PM",
-        "max_participants": 25,
-        "participants": ["mia@mergington.edu", "ethan@mergington.edu"]
-    },
-    "Debate Team": {
-        "description": "Competitive debate and public speaking practice",
-        "schedule": "Mondays, 4:30 PM - 6:00 PM",
-        "max_participants": 18,
-        "participants": ["oliver@mergington.edu", "charlotte@mergington.edu"]
-    },
-    "Science Club": {
-        "description": "Hands-on experiments, projects, and science fairs",
-        "schedule": "Fridays, 3:30 PM - 4:30 PM",
-        "max_participants": 25,
-        "participants": ["liam@mergington.edu", "amelia@mergington.edu"]
-    }
+    "Chess Club": Activity(
+        description="Learn strategies and compete in chess tournaments",
+        schedule="Fridays, 3:30 PM - 5:00 PM",
+        max_participants=12,
+        participants={"michael@mergington.edu", "daniel@mergington.edu"}
+    ),
+    "Programming Class": Activity(
+        description="Learn programming fundamentals and build software projects",
+        schedule="Tuesdays and Thursdays, 3:30 PM - 4:30 PM",
+        max_participants=20,
+        participants={"emma@mergington.edu", "sophia@mergington.edu"}
+    ),
+    "Gym Class": Activity(
+        description="Physical education and sports activities",
+        schedule="Mondays, Wednesdays, Fridays, 2:00 PM - 3:00 PM",
+        max_participants=30,
+        participants={"john@mergington.edu", "olivia@mergington.edu"}
+    ),
+    "Soccer Team": Activity(
+        description="Join the school soccer team for practice and matches",
+        schedule="Mondays and Thursdays, 4:00 PM - 6:00 PM",
+        max_participants=20,
+        participants={"alex@mergington.edu", "lisa@mergington.edu"}
+    ),
+    "Basketball Club": Activity(
+        description="Pickup games and skill development for basketball players",
+        schedule="Tuesdays and Fridays, 4:15 PM - 6:00 PM",
+        max_participants=15,
+        participants={"matt@mergington.edu", "nina@mergington.edu"}
+    ),
+    "Art Club": Activity(
+        description="Explore drawing, painting, and mixed media",
+        schedule="Wednesdays, 3:30 PM - 5:00 PM",
+        max_participants=20,
+        participants={"ava@mergington.edu", "lucas@mergington.edu"}
+    ),
+    "Drama Club": Activity(
+        description="Acting, stagecraft, and school productions",
+        schedule="Thursdays, 4:00 PM - 6:00 PM",
+        max_participants=25,
+        participants={"mia@mergington.edu", "ethan@mergington.edu"}
+    ),
+    "Debate Team": Activity(
+        description="Competitive debate and public speaking practice",
+        schedule="Mondays, 4:30 PM - 6:00 PM",
+        max_participants=18,
+        participants={"oliver@mergington.edu", "charlotte@mergington.edu"}
+    ),
+    "Science Club": Activity(
+        description="Hands-on experiments, projects, and science fairs",
+        schedule="Fridays, 3:30 PM - 4:30 PM",
+        max_participants=25,
+        participants={"liam@mergington.edu", "amelia@mergington.edu"}
+    )
+}
+
+_ENC = msgspec.json.Encoder()
+
+
+def _static_prefix(name, activity):
+    """Serialize an activity's fixed fields, left open for the participants list"""
+    return _ENC.encode(name) + b":" + _ENC.encode({
+        "description": activity.description,
+        "schedule": activity.schedule,
+        "max_participants": activity.max_participants,
+    })[:-1] + b',"participants":'
+
+
+# Prefixes for the activities known at import; others are encoded on demand
+_STATIC_PREFIX = {
+    name: _static_prefix(name, activity) for name, activity in activities.items()
 }
 
+# Cached /activities payload and its ETag; rebuilt lazily after participants change
+_cached_payload = None
+_cached_etag = None
+
+# Shared error responses. Raise them via .with_traceback(None) so a reused
+# instance does not keep growing its traceback across requests.
+_ERR_NOT_FOUND = HTTPException(status_code=404, detail="Activity not found")
+_ERR_DUP = HTTPException(status_code=400, detail="Student already signed up for this activity")
+_ERR_FULL = HTTPException(status_code=400, detail="Activity is full")
+_ERR_NOT_REGISTERED = HTTPException(status_code=400, detail="Student is not registered for this activity")
+
+# Pre-serialized bodies for the shared errors, keyed by status code and detail
+_ERR_BODIES = {
+    (exc.status_code, exc.detail): _ENC.encode({"detail": exc.detail})
+    for exc in (_ERR_NOT_FOUND, _ERR_DUP, _ERR_FULL, _ERR_NOT_REGISTERED)
+}
+
+# The root redirect never changes, so a single response instance is reused
+_ROOT_REDIRECT = RedirectResponse(url="/static/index.html")
+
+
+def _serialize_activities():
+    """Build the /activities payload, re-encoding only the participant lists"""
+    # Participant sets are emitted as sorted lists for a stable ordering
+    return b"{" + b",".join(
+        (_STATIC_PREFIX.get(name) or _static_prefix(name, activity))
+        + _ENC.encode(sorted(activity.participants)) + b"}"
+        for name, activity in activities.items()
+    ) + b"}"
+
+
+def _get_activity(activity_name):
+    """Look up an activity by name, raising 404 if it does not exist"""
+    activity = activities.get(activity_name)
+    if activity is None:
+        raise _ERR_NOT_FOUND.with_traceback(None)
+    return activity
+
+
+@app.exception_handler(StarletteHTTPException)
+async def prebuilt_http_exception_handler(request: Request, exc: StarletteHTTPException):
+    """Serve known error details from pre-serialized bodies"""
+    body = _ERR_BODIES.get((exc.status_code, exc.detail)) if isinstance(exc.detail, str) else None
+    if body is None:
+        return await http_exception_handler(request, exc)
+    return Response(body, status_code=exc.status_code, media_type="application/json")
+
 
 @app.get("/")
-def root():
-    return RedirectResponse(url="/static/index.html")
+async def root():
+    return _ROOT_REDIRECT
 
 
 @app.get("/activities")
-def get_activities():
-    return activities
+async def get_activities(request: Request):
+    global _cached_payload, _cached_etag
+
+    if _cached_payload is None:
+        _cached_payload = _serialize_activities()
+        digest = hashlib.blake2b(_cached_payload, digest_size=8).hexdigest()
+        _cached_etag = f'W/"{digest}"'
+
+    # Clients must revalidate, so a signup is visible on the next fetch
+    headers = {"ETag": _cached_etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == _cached_etag:
+        return Response(status_code=304, headers=headers)
+    return Response(_cached_payload, media_type="application/json", headers=headers)
 
 
 @app.post("/activities/{activity_name}/signup")
-def signup_for_activity(activity_name: str, email: str):
+async def signup_for_activity(activity_name: str, email: str):
     """Sign up a student for an activity"""
-    # Validate activity exists
-    if activity_name not in activities:
-        raise HTTPException(status_code=404, detail="Activity not found")
+    global _cached_payload
+
+    # Emails are case-insensitive, so compare and store one canonical form
+    email = email.strip().lower()
 
-    # Get the specific activity
-    activity = activities[activity_name]
+    # Get the specific activity, validating that it exists
+    activity = _get_activity(activity_name)
 
     # Add student
     # Validate student is not already signed up
-    if email in activity["participants"]:
-        raise HTTPException(status_code=400, detail="Student already signed up for this activity")
-    
-    activity["participants"].append(email)
-    return {"message": f"Signed up {email} for {activity_name}"}
+    if email in activity.participants:
+        raise _ERR_DUP.with_traceback(None)
+
+    # Validate there is still room in the activity
+    if activity.remaining <= 0:
+        raise _ERR_FULL.with_traceback(None)
+
+    activity.participants.add(email)
+    activity.remaining -= 1
+    _cached_payload = None
+    body = _ENC.encode({"message": f"Signed up {email} for {activity_name}"})
+    return Response(body, media_type="application/json")
 
 
 @app.delete("/activities/{activity_name}/unregister")
-def unregister_from_activity(activity_name: str, email: str):
+async def unregister_from_activity(activity_name: str, email: str):
     """Unregister a student from an activity"""
-    # Validate activity exists
-    if activity_name not in activities:
-        raise HTTPException(status_code=404, detail="Activity not found")
+    global _cached_payload
+
+    # Emails are case-insensitive, so compare and store one canonical form
+    email = email.strip().lower()
 
-    # Get the specific activity
-    activity = activities[activity_name]
+    # Get the specific activity, validating that it exists
+    activity = _get_activity(activity_name)
 
     # Check if student is registered
-    if email not in activity["participants"]:
-        raise HTTPException(status_code=400, detail="Student is not registered for this activity")
+    if email not in activity.participants:
+        raise _ERR_NOT_REGISTERED.with_traceback(None)
     
     # Remove student
-    activity["participants"].remove(email)
-    return {"message": f"Unregistered {email} from {activity_name}"}
+    activity.participants.remove(email)
+    activity.remaining += 1
+    _cached_payload = None
+    body = _ENC.encode({"message": f"Unregistered {email} from {activity_name}"})
+    return Response(body, media_type="application/json")
@@ -2,44 +2,46 @@
 Tests for the Mergington High School Activities FastAPI application.
 """
 
+import copy
+import importlib.util
+
 import pytest
-from fastapi.testclient import TestClient
+from httpx import ASGITransport, AsyncClient
+import src.app as app_module
 from src.app import app, activities
 
 
 @pytest.fixture
-def client():
-    """Create a test client for the FastAPI app."""
-    return TestClient(app)
+async def client():
+    """Create an async test client bound to the FastAPI app."""
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+
+
+@pytest.fixture(scope="session")
+def activities_snapshot():
+    """Snapshot the initial activities data once per test session."""
+    return copy.deepcopy(activities)
 
 
 @pytest.fixture
-def reset_activities():
-    """Reset activities data before each test."""
-    # Store original activities
-    original_activities = {
-        name: {
-            "description": details["description"],
-            "schedule": details["schedule"],
-            "max_participants": details["max_participants"],
-            "participants": details["participants"].copy()
-        }
-        for name, details in activities.items()
-    }
-    
+def reset_activities(activities_snapshot):
+    """Reset activities data after each test."""
     yield
-    
+
     # Reset activities after test
     activities.clear()
-    activities.update(original_activities)
+    activities.update(copy.deepcopy(activities_snapshot))
+    app_module._cached_payload = None
 
 
 class TestActivitiesEndpoints:
     """Test class for activities-related endpoints."""
 
-    def test_get_activities(self, client):
+    async def test_get_activities(self, client):
         """Test getting all activities."""
-        response = client.get("/activities")
+        response = await client.get("/activities")
         assert response.status_code == 200
         data = response.json()
         
@@ -55,164 +57,318 @@ class TestActivitiesEndpoints:
         assert "participants" in first_activity
         assert isinstance(first_activity["participants"], list)
 
-    def test_root_redirects_to_static(self, client):
+    async def test_get_activities_matches_data(self, client):
+        """Test that the activities payload mirrors the in-memory data."""
+        response = await client.get("/activities")
+        assert response.status_code == 200
+
+        expected = {
+            name: {
+                "description": activity.description,
+                "schedule": activity.schedule,
+                "max_participants": activity.max_participants,
+                "participants": sorted(activity.participants),
+            }
+            for name, activity in activities.items()
+        }
+        assert response.json() == expected
+        assert list(response.json()) == list(activities)
+
+    async def test_get_activities_not_modified(self, client):
+        """Test that a matching If-None-Match header yields 304."""
+        response = await client.get("/activities")
+        etag = response.headers["etag"]
+
+        cached_response = await client.get("/activities", headers={"If-None-Match": etag})
+        assert cached_response.status_code == 304
+        assert cached_response.content == b""
+        assert cached_response.headers["etag"] == etag
+
+    async def test_root_redirects_to_static(self, client):
         """Test that root path redirects to static files."""
-        response = client.get("/", follow_redirects=False)
+        response = await client.get("/", follow_redirects=False)
         assert response.status_code == 307
         assert response.headers["location"] == "/static/index.html"
 
+    async def test_static_index_served(self, client):
+        """Test that the static frontend is served from the mounted directory."""
+        response = await client.get("/static/index.html")
+        assert response.status_code == 200
+        assert "text/html" in response.headers["content-type"]
+
+    async def test_unknown_route_returns_default_error(self, client):
+        """Test that errors without a prebuilt body use the default handler."""
+        response = await client.get("/does-not-exist")
+        assert response.status_code == 404
+        assert response.json() == {"detail": "Not Found"}
+
+
+class TestProductionSettings:
+    """Test class for production-only configuration."""
+
+    async def test_docs_disabled_in_prod(self, monkeypatch):
+        """Test that API docs and the OpenAPI schema are not served when ENV=prod."""
+        monkeypatch.setenv("ENV", "prod")
+
+        # Load a separate copy of the module so the shared app and data stay untouched
+        spec = importlib.util.spec_from_file_location("prod_app", app_module.__file__)
+        prod_module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(prod_module)
+
+        transport = ASGITransport(app=prod_module.app)
+        async with AsyncClient(transport=transport, base_url="http://test") as prod_client:
+            for path in ("/docs", "/redoc", "/openapi.json"):
+                response = await prod_client.get(path)
+                assert response.status_code == 404
+
 
 class TestSignupEndpoint:
     """Test class for signup functionality."""
 
-    def test_signup_for_activity_success(self, client, reset_activities):
+    async def test_signup_for_activity_success(self, client, reset_activities):
         """Test successful signup for an activity."""
         activity_name = "Chess Club"
         email = "test@mergington.edu"
         
-        response = client.post(f"/activities/{activity_name}/signup?email={email}")
+        response = await client.post(f"/activities/{activity_name}/signup?email={email}")
         assert response.status_code == 200
         data = response.json()
         assert data["message"] == f"Signed up {email} for {activity_name}"
         
         # Verify the participant was added
-        assert email in activities[activity_name]["participants"]
+        assert email in activities[activity_name].participants
 
-    def test_signup_for_nonexistent_activity(self, client, reset_activities):
+    async def test_signup_for_nonexistent_activity(self, client, reset_activities):
         """Test signup for an activity that doesn't exist."""
         activity_name = "Nonexistent Activity"
         email = "test@mergington.edu"
         
-        response = client.post(f"/activities/{activity_name}/signup?email={email}")
+        response = await client.post(f"/activities/{activity_name}/signup?email={email}")
         assert response.status_code == 404
         data = response.json()
         assert data["detail"] == "Activity not found"
 
-    def test_signup_duplicate_participant(self, client, reset_activities):
+    async def test_signup_duplicate_participant(self, client, reset_activities):
         """Test signing up the same participant twice."""
         activity_name = "Chess Club"
         email = "test@mergington.edu"
         
         # First signup should succeed
-        response1 = client.post(f"/activities/{activity_name}/signup?email={email}")
+        response1 = await client.post(f"/activities/{activity_name}/signup?email={email}")
         assert response1.status_code == 200
         
         # Second signup should fail
-        response2 = client.post(f"/activities/{activity_name}/signup?email={email}")
+        response2 = await client.post(f"/activities/{activity_name}/signup?email={email}")
         assert response2.status_code == 400
         data = response2.json()
         assert data["detail"] == "Student already signed up for this activity"
 
-    def test_signup_with_existing_participant(self, client, reset_activities):
+    async def test_signup_with_existing_participant(self, client, reset_activities):
         """Test signup when participant already exists in the activity."""
         activity_name = "Chess Club"
         existing_email = "michael@mergington.edu"  # Already in Chess Club
         
-        response = client.post(f"/activities/{activity_name}/signup?email={existing_email}")
+        response = await client.post(f"/activities/{activity_name}/signup?email={existing_email}")
         assert response.status_code == 400
         data = response.json()
         assert data["detail"] == "Student already signed up for this activity"
 
+    async def test_signup_duplicate_participant_different_case(self, client, reset_activities):
+        """Test that email case does not bypass the duplicate check."""
+        activity_name = "Chess Club"
+
+        response = await client.post(f"/activities/{activity_name}/signup?email=Michael@Mergington.edu")
+        assert response.status_code == 400
+        data = response.json()
+        assert data["detail"] == "Student already signed up for this activity"
+
+    async def test_signup_for_full_activity(self, client, reset_activities):
+        """Test that signup is rejected once an activity is full."""
+        activity_name = "Chess Club"
+        open_spots = activities[activity_name].remaining
+
+        for i in range(open_spots):
+            response = await client.post(f"/activities/{activity_name}/signup?email=full{i}@mergington.edu")
+            assert response.status_code == 200
+        assert activities[activity_name].remaining == 0
+
+        response = await client.post(f"/activities/{activity_name}/signup?email=late@mergington.edu")
+        assert response.status_code == 400
+        data = response.json()
+        assert data["detail"] == "Activity is full"
+        assert "late@mergington.edu" not in activities[activity_name].participants
+
+        # Unregistering frees a spot again
+        response = await client.delete(f"/activities/{activity_name}/unregister?email=full0@mergington.edu")
+        assert response.status_code == 200
+        response = await client.post(f"/activities/{activity_name}/signup?email=late@mergington.edu")
+        assert response.status_code == 200
+
 
 class TestUnregisterEndpoint:
     """Test class for unregister functionality."""
 
-    def test_unregister_from_activity_success(self, client, reset_activities):
+    async def test_unregister_from_activity_success(self, client, reset_activities):
         """Test successful unregistration from an activity."""
         activity_name = "Chess Club"
         email = "michael@mergington.edu"  # Already registered
         
         # Verify participant is initially registered
-        assert email in activities[activity_name]["participants"]
+        assert email in activities[activity_name].participants
         
-        response = client.delete(f"/activities/{activity_name}/unregister?email={email}")
+        response = await client.delete(f"/activities/{activity_name}/unregister?email={email}")
         assert response.status_code == 200
         data = response.json()
         assert data["message"] == f"Unregistered {email} from {activity_name}"
         
         # Verify the participant was removed
-        assert email not in activities[activity_name]["participants"]
+        assert email not in activities[activity_name].participants
 
-    def test_unregister_from_nonexistent_activity(self, client, reset_activities):
+    async def test_unregister_from_nonexistent_activity(self, client, reset_activities):
         """Test unregistration from an activity that doesn't exist."""
         activity_name = "Nonexistent Activity"
         email = "test@mergington.edu"
         
-        response = client.delete(f"/activities/{activity_name}/unregister?email={email}")
+        response = await client.delete(f"/activities/{activity_name}/unregister?email={email}")
         assert response.status_code == 404
         data = response.json()
         assert data["detail"] == "Activity not found"
 
-    def test_unregister_nonexistent_participant(self, client, reset_activities):
+    async def test_unregister_nonexistent_participant(self, client, reset_activities):
         """Test unregistering a participant who isn't registered."""
         activity_name = "Chess Club"
         email = "notregistered@mergington.edu"
         
-        response = client.delete(f"/activities/{activity_name}/unregister?email={email}")
+        response = await client.delete(f"/activities/{activity_name}/unregister?email={email}")
         assert response.status_code == 400
         data = response.json()
         assert data["detail"] == "Student is not registered for this activity"
 
+    async def test_unregister_normalizes_email(self, client, reset_activities):
+        """Test unregistering with a differently cased, padded email."""
+        activity_name = "Chess Club"
+
+        response = await client.delete(f"/activities/{activity_name}/unregister?email= Daniel@Mergington.EDU ")
+        assert response.status_code == 200
+        assert "daniel@mergington.edu" not in activities[activity_name].participants
+
 
 class TestIntegrationScenarios:
     """Test class for integration scenarios."""
 
-    def test_signup_and_unregister_flow(self, client, reset_activities):
+    async def test_signup_and_unregister_flow(self, client, reset_activities):
         """Test the complete flow of signup and unregister."""
         activity_name = "Programming Class"
         email = "integration_test@mergington.edu"
         
         # Initial state - participant should not be registered
-        assert email not in activities[activity_name]["participants"]
+        assert email not in activities[activity_name].participants
         
         # Step 1: Sign up
-        signup_response = client.post(f"/activities/{activity_name}/signup?email={email}")
+        signup_response = await client.post(f"/activities/{activity_name}/signup?email={email}")
         assert signup_response.status_code == 200
-        assert email in activities[activity_name]["participants"]
+        assert email in activities[activity_name].participants
         
         # Step 2: Unregister
-        unregister_response = client.delete(f"/activities/{activity_name}/unregister?email={email}")
+        unregister_response = await client.delete(f"/activities/{activity_name}/unregister?email={email}")
         assert unregister_response.status_code == 200
-        assert email not in activities[activity_name]["participants"]
+        assert email not in activities[activity_name].participants
 
-    def test_multiple_participants_same_activity(self, client, reset_activities):
+    async def test_multiple_participants_same_activity(self, client, reset_activities):
         """Test multiple participants can sign up for the same activity."""
         activity_name = "Gym Class"
         emails = ["test1@mergington.edu", "test2@mergington.edu", "test3@mergington.edu"]
         
         # Sign up all participants
         for email in emails:
-            response = client.post(f"/activities/{activity_name}/signup?email={email}")
+            response = await client.post(f"/activities/{activity_name}/signup?email={email}")
             assert response.status_code == 200
-            assert email in activities[activity_name]["participants"]
+            assert email in activities[activity_name].participants
         
         # Verify all are registered
         for email in emails:
-            assert email in activities[activity_name]["participants"]
+            assert email in activities[activity_name].participants
         
         # Unregister one participant
-        response = client.delete(f"/activities/{activity_name}/unregister?email={emails[0]}")
+        response = await client.delete(f"/activities/{activity_name}/unregister?email={emails[0]}")
         assert response.status_code == 200
-        assert emails[0] not in activities[activity_name]["participants"]
+        assert emails[0] not in activities[activity_name].participants
         
         # Verify others are still registered
         for email in emails[1:]:
-            assert email in activities[activity_name]["participants"]
+            assert email in activities[activity_name].participants
+
+    async def test_activities_payload_refreshed_after_unregister(self, client, reset_activities):
+        """Test that the cached activities payload is rebuilt after a change."""
+        activity_name = "Drama Club"
+        email = "mia@mergington.edu"
+
+        # Prime the cached payload
+        initial_response = await client.get("/activities")
+        assert email in initial_response.json()[activity_name]["participants"]
+
+        await client.delete(f"/activities/{activity_name}/unregister?email={email}")
+
+        updated_response = await client.get("/activities")
+        assert email not in updated_response.json()[activity_name]["participants"]
+
+    async def test_activity_added_at_runtime_is_listed(self, client, reset_activities):
+        """Test that an activity added after import appears in the payload."""
+        activities["Robotics Club"] = app_module.Activity(
+            description="Build and program robots for competitions",
+            schedule="Wednesdays, 4:00 PM - 5:30 PM",
+            max_participants=10,
+            participants={"zoe@mergington.edu"}
+        )
+        app_module._cached_payload = None
+
+        response = await client.get("/activities")
+        assert response.status_code == 200
+        assert response.json()["Robotics Club"] == {
+            "description": "Build and program robots for competitions",
+            "schedule": "Wednesdays, 4:00 PM - 5:30 PM",
+            "max_participants": 10,
+            "participants": ["zoe@mergington.edu"],
+        }
+
+    async def test_activities_payload_stored_after_rebuild(self, client, reset_activities):
+        """Test that a payload rebuilt after a change is reused by later reads."""
+        await client.post("/activities/Art Club/signup?email=cache_test@mergington.edu")
+        assert app_module._cached_payload is None
+
+        await client.get("/activities")
+        payload = app_module._cached_payload
+        assert payload is not None
+
+        await client.get("/activities")
+        assert app_module._cached_payload is payload
+
+    async def test_activities_etag_changes_after_signup(self, client, reset_activities):
+        """Test that a stale ETag no longer matches after a signup."""
+        initial_response = await client.get("/activities")
+        etag = initial_response.headers["etag"]
+
+        await client.post("/activities/Science Club/signup?email=etag_test@mergington.edu")
+
+        updated_response = await client.get("/activities", headers={"If-None-Match": etag})
+        assert updated_response.status_code == 200
+        assert updated_response.headers["etag"] != etag
+        assert "etag_test@mergington.edu" in updated_response.json()["Science Club"]["participants"]
 
-    def test_activity_data_integrity(self, client, reset_activities):
+    async def test_activity_data_integrity(self, client, reset_activities):
         """Test that activity data remains consistent after operations."""
         # Get initial activities data
-        initial_response = client.get("/activities")
+        initial_response = await client.get("/activities")
         initial_data = initial_response.json()
         
         activity_name = "Art Club"
         email = "integrity_test@mergington.edu"
         
         # Perform signup
-        client.post(f"/activities/{activity_name}/signup?email={email}")
+        await client.post(f"/activities/{activity_name}/signup?email={email}")
         
         # Get updated activities data
-        updated_response = client.get("/activities")
+        updated_response = await client.get("/activities")
         updated_data = updated_response.json()
         
         # Verify only the participants list changed